@@ -0,0 +1,43 @@
+import io
+import json
+import random
+
+from json_stream import iter_items
+
+
+def random_json_value(rng, depth=0):
+    kind = rng.randrange(8 if depth < 2 else 6)
+    if kind == 0:
+        return rng.randint(-10 ** 6, 10 ** 6)
+    if kind == 1:
+        return rng.uniform(-1e6, 1e6) * 10 ** rng.randint(-12, 12)
+    if kind == 2:
+        return rng.choice([True, False, None, 0, -0.5, 1e-7, 2.5])
+    if kind in (3, 4, 5):
+        return "".join(rng.choice('ab ,:]}"\\\u0e01\n-1.e') for _ in range(rng.randrange(6)))
+    if kind == 6:
+        return [random_json_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f"k{i}": random_json_value(rng, depth + 1) for i in range(rng.randrange(4))}
+
+
+def check_stream(trials=3000, seed=0):
+    # Round-trips random documents through iter_items at tiny chunk sizes so every
+    # token gets split at every possible boundary, comparing against json.loads.
+    rng = random.Random(seed)
+    for trial in range(trials):
+        doc = {f"h{i}": random_json_value(rng) for i in range(rng.randrange(4))}
+        doc["stores"] = [random_json_value(rng) for _ in range(rng.randrange(5))]
+        doc.update({f"t{i}": random_json_value(rng) for i in range(rng.randrange(3))})
+        text = json.dumps(doc, ensure_ascii=False, indent=rng.choice([None, 2]))
+        expected = json.loads(text)
+        chunk_size = 1 + trial % 9
+        header = {}
+        items = list(iter_items(io.StringIO(text), "stores", header, chunk_size))
+        header["stores"] = items
+        if header != expected:
+            raise AssertionError(f"Stream mismatch (chunk size {chunk_size}): {text}")
+    print(f"Stream round-trip OK ({trials} documents)")
+
+
+if __name__ == "__main__":
+    check_stream()
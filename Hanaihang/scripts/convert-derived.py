@@ -0,0 +1,166 @@
+import argparse
+import copy
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from directory_records import Floor, Store, write_directory
+from json_stream import CHUNK_SIZE, iter_items
+
+DERIVED_DIR = os.path.join("data", "derived")
+DIRECTORIES_DIR = os.path.join("data", "directories")
+MANIFEST_PATH = os.path.join(DIRECTORIES_DIR, ".convert-manifest.json")
+
+# Mapping specs keyed by derived file name (without .json). Derived files without a
+# spec (e.g. malls-photon.json, reports) are not store directories and are skipped.
+SOURCES = {
+    "siamparagon-directory": {
+        "mallSlug": "siam-paragon",
+        "sourceName": "Siam Paragon Directory (derived)",
+        "itemsKey": "stores",
+        "floorField": "floor",
+        # Output store field -> derived field.
+        "fields": {
+            "name": "name",
+            "category": "category",
+            "categoryLabel": "category",
+            "keywords": "keywords",
+        },
+        # Used when a mapped field is missing, and written as-is when not mapped.
+        "defaults": {
+            "category": "Services",
+            "categoryLabel": None,
+            "unit": "",
+            "hours": None,
+            "status": "Active",
+            "keywords": [],
+        },
+        "floors": {
+            "unknown": "UNKNOWN",
+            "name": "{floor} Floor",
+            # Sort order by first character of the floor id (rough estimation)
+            "order": {"B": -1, "G": 0, "M": 1, "1": 2, "2": 3, "3": 4, "4": 5, "5": 6, "6": 7},
+        },
+    },
+}
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def spec_hash(spec):
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def convert_source(src_path, spec, previous, force=False):
+    fingerprint = {"input": file_hash(src_path), "spec": spec_hash(spec)}
+    out_path = os.path.join(DIRECTORIES_DIR, f"{spec['mallSlug']}.json")
+    if not force and previous == fingerprint and os.path.exists(out_path):
+        return {"path": out_path, "fingerprint": fingerprint, "skipped": True}
+
+    fields = spec["fields"]
+    defaults = spec["defaults"]
+    constants = {key: value for key, value in defaults.items() if key not in fields}
+    floor_spec = spec["floors"]
+    unknown = floor_spec["unknown"]
+
+    header = {}
+    floors = {}
+    with open(src_path, "r", encoding="utf-8") as f:
+        for item in iter_items(f, spec["itemsKey"], header):
+            name = item.get(fields["name"])
+            if not name:
+                continue
+            floor_id = item.get(spec["floorField"]) or unknown
+            floor = floors.get(floor_id)
+            if floor is None:
+                floor = floors[floor_id] = Floor(
+                    floor_id,
+                    floor_id,
+                    floor_spec["name"].format(floor=floor_id) if floor_id != unknown else unknown,
+                    floor_spec["order"].get(floor_id[0].upper(), 0),
+                )
+
+            # Copy per store so mutable defaults (e.g. keywords=[]) are never shared.
+            values = {field: copy.copy(value) for field, value in constants.items()}
+            for field, key in fields.items():
+                if field != "name":
+                    values[field] = item[key] if key in item else copy.copy(defaults.get(field))
+            floor.stores.append(Store(name, floorId=floor.id, floorLabel=floor.name, **values))
+
+    floor_entries = sorted(floors.values(), key=lambda x: x.order)
+    source = {
+        "name": spec["sourceName"],
+        "url": header.get("source"),
+        "retrievedAt": header.get("retrievedAt"),
+    }
+    retrieved_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    store_count = write_directory(out_path, spec["mallSlug"], source, floor_entries, retrieved_at)
+    return {"path": out_path, "fingerprint": fingerprint, "skipped": False, "storeCount": store_count}
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert data/derived/*.json into store directory JSONs")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Convert even when inputs are unchanged")
+    args = parser.parse_args()
+
+    os.makedirs(DIRECTORIES_DIR, exist_ok=True)
+    manifest = load_manifest()
+
+    jobs = {}
+    for src_path in sorted(glob.glob(os.path.join(DERIVED_DIR, "*.json"))):
+        name = os.path.splitext(os.path.basename(src_path))[0]
+        if name not in SOURCES:
+            print(f"Skipped {src_path} (no mapping spec)")
+            continue
+        jobs[name] = src_path
+
+    if not jobs:
+        print(f"No convertible sources found in {DERIVED_DIR}")
+        return
+
+    failed = False
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {
+            pool.submit(convert_source, src_path, SOURCES[name], manifest.get(name), args.force): name
+            for name, src_path in jobs.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                failed = True
+                print(f"Failed {jobs[name]}: {exc}")
+                continue
+            manifest[name] = result["fingerprint"]
+            if result["skipped"]:
+                print(f"Unchanged {jobs[name]} -> {result['path']}")
+            else:
+                print(f"Converted {result['storeCount']} stores from {jobs[name]} to {result['path']}")
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import json
+import sys
+
+# Serialized key order for store records; a field is only written when it was set.
+STORE_FIELDS = (
+    "id",
+    "name",
+    "category",
+    "categoryLabel",
+    "floorId",
+    "floorLabel",
+    "unit",
+    "phone",
+    "hours",
+    "status",
+    "landmarks",
+    "keywords",
+    "sourceType",
+    "nameLocal",
+)
+
+# Low-cardinality fields repeated across thousands of stores share one string object.
+INTERNED_FIELDS = frozenset({"category", "categoryLabel", "floorId", "floorLabel", "status", "sourceType"})
+
+_UNSET = object()
+
+
+def intern_text(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+class Store:
+    __slots__ = STORE_FIELDS
+
+    def __init__(self, name, **fields):
+        self.name = name
+        for field, value in fields.items():
+            if field in INTERNED_FIELDS:
+                value = intern_text(value)
+            setattr(self, field, value)
+
+    def items(self):
+        for field in STORE_FIELDS:
+            value = getattr(self, field, _UNSET)
+            if value is not _UNSET:
+                yield field, value
+
+
+class Floor:
+    __slots__ = ("id", "label", "name", "order", "stores")
+
+    def __init__(self, floor_id, label=None, name=None, order=0):
+        self.id = intern_text(floor_id)
+        self.label = intern_text(label if label is not None else floor_id)
+        self.name = intern_text(name if name is not None else self.label)
+        self.order = order
+        self.stores = []
+
+    def items(self):
+        yield "id", self.id
+        yield "label", self.label
+        yield "name", self.name
+        yield "order", self.order
+        yield "stores", self.stores
+
+
+def _encode(value, level):
+    # Matches json.dump(..., ensure_ascii=False, indent=2) for a value nested at `level`.
+    text = json.dumps(value, ensure_ascii=False, indent=2)
+    if "\n" in text:
+        text = text.replace("\n", "\n" + "  " * level)
+    return text
+
+
+def _write_object(write, pairs, level):
+    pad = "  " * (level + 1)
+    first = True
+    for key, value in pairs:
+        write("{\n" if first else ",\n")
+        first = False
+        write(f"{pad}{json.dumps(key, ensure_ascii=False)}: ")
+        if isinstance(value, list) and value and isinstance(value[0], (Store, Floor)):
+            _write_records(write, value, level + 1)
+        else:
+            write(_encode(value, level + 1))
+    write("{}" if first else "\n" + "  " * level + "}")
+
+
+def _write_records(write, records, level):
+    pad = "  " * (level + 1)
+    write("[")
+    for index, record in enumerate(records):
+        write(f"\n{pad}" if index == 0 else f",\n{pad}")
+        _write_object(write, record.items(), level + 1)
+    write("\n" + "  " * level + "]")
+
+
+def write_directory(path, mall_slug, source, floors, retrieved_at, store_count=None):
+    if store_count is None:
+        store_count = sum(len(floor.stores) for floor in floors)
+    header = (
+        ("mallSlug", mall_slug),
+        ("source", source),
+        ("retrievedAt", retrieved_at),
+        ("floorCount", len(floors)),
+        ("storeCount", store_count),
+        ("floors", floors),
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        _write_object(f.write, header, 0)
+    return store_count
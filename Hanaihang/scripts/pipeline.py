@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Stage:
+    # `func(item)` returns an iterable of outputs for the next stage (or None for the
+    # last stage). `close()` runs once after the stage has drained all of its input.
+    def __init__(self, name, func, workers=1, maxsize=16, close=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.close = close
+        self.inbox = queue.Queue(maxsize)
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.max_queued = 0
+        self._active = 0
+        self._running = workers
+        self._lock = threading.Lock()
+
+    def stats(self, elapsed):
+        capacity = self.workers * elapsed
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "active": self._active,
+            "processed": self.processed,
+            "queued": self.inbox.qsize(),
+            "maxQueued": self.max_queued,
+            "busySeconds": self.busy_seconds,
+            "utilization": self.busy_seconds / capacity if capacity else 0.0,
+        }
+
+
+class Pipeline:
+    def __init__(self, stages, poll_interval=0.1, cancel_timeout=1.0):
+        self.stages = stages
+        self.poll_interval = poll_interval
+        self.cancel_timeout = cancel_timeout
+        self.cancelled = threading.Event()
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._error_lock = threading.Lock()
+
+    def fail(self, exc):
+        with self._error_lock:
+            if self.error is None:
+                self.error = exc
+        self.cancelled.set()
+
+    def _put(self, stage, item):
+        while not self.cancelled.is_set():
+            try:
+                stage.inbox.put(item, timeout=self.poll_interval)
+            except queue.Full:
+                continue
+            queued = stage.inbox.qsize()
+            if queued > stage.max_queued:
+                stage.max_queued = queued
+            return True
+        return False
+
+    def _get(self, stage):
+        while not self.cancelled.is_set():
+            try:
+                return stage.inbox.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _work(self, index):
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        try:
+            while True:
+                item = self._get(stage)
+                if item is _DONE:
+                    break
+                with stage._lock:
+                    stage._active += 1
+                busy = 0.0
+                results = None
+                started = time.perf_counter()
+                try:
+                    results = stage.func(item)
+                    for result in results or ():
+                        busy += time.perf_counter() - started
+                        started = None
+                        # Blocking here is backpressure from downstream, not work.
+                        if downstream and not self._put(downstream, result):
+                            return
+                        started = time.perf_counter()
+                finally:
+                    if started is not None:
+                        busy += time.perf_counter() - started
+                    if hasattr(results, "close"):
+                        results.close()
+                    with stage._lock:
+                        stage._active -= 1
+                        stage.busy_seconds += busy
+                        stage.processed += 1
+        except BaseException as exc:
+            self.fail(exc)
+        finally:
+            with stage._lock:
+                stage._running -= 1
+                last = stage._running == 0
+            if last and not self.cancelled.is_set():
+                self._finish(stage, downstream)
+
+    def _finish(self, stage, downstream):
+        try:
+            if stage.close:
+                for result in stage.close() or ():
+                    if downstream and not self._put(downstream, result):
+                        return
+        except BaseException as exc:
+            self.fail(exc)
+            return
+        if downstream:
+            for _ in range(downstream.workers):
+                self._put(downstream, _DONE)
+
+    def run(self, items):
+        self.started_at = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._work, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+            for index, stage in enumerate(self.stages)
+            for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        first = self.stages[0]
+        try:
+            for item in items:
+                if not self._put(first, item):
+                    break
+            for _ in range(first.workers):
+                self._put(first, _DONE)
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(self.poll_interval)
+        except BaseException as exc:
+            self.fail(exc)
+            # Workers notice cancellation within a poll interval unless they are stuck
+            # in blocking I/O (e.g. urlopen); those daemon threads are left behind.
+            deadline = time.perf_counter() + self.cancel_timeout
+            for thread in threads:
+                while thread.is_alive() and time.perf_counter() < deadline:
+                    thread.join(self.poll_interval)
+        finally:
+            self.finished_at = time.perf_counter()
+
+        if self.error is not None:
+            raise self.error
+
+    def stats(self):
+        if self.started_at is None:
+            return []
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return [stage.stats(elapsed) for stage in self.stages]
+
+    def report(self):
+        lines = []
+        for stats in self.stats():
+            lines.append(
+                f"  {stats['name']}: {stats['processed']} items, {stats['workers']} worker(s), "
+                f"busy {stats['busySeconds']:.2f}s ({stats['utilization']:.0%}), "
+                f"queue {stats['queued']} (max {stats['maxQueued']})"
+            )
+        return lines
@@ -1,14 +1,16 @@
-import json
+import codecs
 import os
 import re
 from datetime import datetime, timezone
-from html.parser import HTMLParser
 from urllib.request import Request, urlopen
 
+from directory_records import Floor, Store, write_directory
+from pipeline import Pipeline, Stage
+from token_grammar import SKIP, START, HtmlTokenParser, TokenClass, TokenGrammar, assign, context, emit
+
 DIRECTORY_URL = "https://dg-directory-physical.cpn.co.th/directory/line/CWN/en/shoplist/"
 USER_AGENT = "Mozilla/5.0 (HanaihangDataBot/1.0)"
-
-FLOOR_TOKEN_RE = re.compile(r"^(B\\d+|GF|G|UG|LG|MF|M|\\d{1,2}F)$", re.IGNORECASE)
+READ_SIZE = 16 * 1024
 
 SKIP_TOKENS = {
     "Shop search",
@@ -37,21 +39,33 @@ CATEGORY_HEADERS = {
 }
 
 
-class TextCollector(HTMLParser):
-    def __init__(self):
-        super().__init__()
-        self.tokens = []
-
-    def handle_data(self, data):
-        text = data.strip()
-        if text:
-            self.tokens.append(text)
+SHOPLIST_GRAMMAR = TokenGrammar(
+    [
+        TokenClass("start", [START], tokens={"ALL SHOPS"}),
+        TokenClass("skip", [SKIP], tokens=SKIP_TOKENS),
+        TokenClass("category", [context("categoryLabel")], tokens=CATEGORY_HEADERS),
+        TokenClass("floor", [emit("floor", requires="name", transform=str.upper)],
+                   pattern=r"(?i:B\d+|GF|G|UG|LG|MF|M|\d{1,2}F)"),
+    ],
+    default=TokenClass("name", [assign("name")]),
+)
 
 
-def fetch_html():
-    req = Request(DIRECTORY_URL, headers={"User-Agent": USER_AGENT})
+def fetch_html(url):
+    # Yields decoded text as it downloads so parsing can start before the body ends.
+    req = Request(url, headers={"User-Agent": USER_AGENT})
+    decoder = codecs.getincrementaldecoder("utf-8")("ignore")
     with urlopen(req, timeout=30) as resp:
-        return resp.read().decode("utf-8", "ignore")
+        while True:
+            chunk = resp.read(READ_SIZE)
+            if not chunk:
+                break
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
 
 
 def normalize_category(label):
@@ -81,103 +95,79 @@ def normalize_category(label):
     return "Services"
 
 
-def parse_tokens(tokens):
-    entries = []
-    current_category = None
-    pending_shop = None
-    started = False
-
-    for token in tokens:
-        if token in SKIP_TOKENS:
-            if token == "ALL SHOPS":
-                started = True
-            continue
-        if not started:
-            continue
-
-        if token in CATEGORY_HEADERS:
-            current_category = token
-            continue
-
-        if FLOOR_TOKEN_RE.match(token):
-            if pending_shop:
-                entries.append({
-                    "name": pending_shop,
-                    "floor": token.upper(),
-                    "categoryLabel": current_category,
-                })
-                pending_shop = None
-            continue
-
-        # Treat remaining tokens as shop names
-        pending_shop = token
-
-    return entries
+def entry_to_store(entry):
+    floor_label = entry.get("floor", "UNKNOWN")
+    return Store(
+        entry["name"],
+        category=normalize_category(entry.get("categoryLabel")),
+        categoryLabel=entry.get("categoryLabel"),
+        floorId=floor_label.replace("F", ""),
+        floorLabel=floor_label,
+        status="Active",
+    )
 
 
 def main():
-    html = fetch_html()
-    parser = TextCollector()
-    parser.feed(html)
-    entries = parse_tokens(parser.tokens)
+    out_dir = os.path.join(os.getcwd(), "data", "directories")
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, "central-chaengwattana.json")
 
     floors = {}
-    for entry in entries:
-        floor_label = entry.get("floor", "UNKNOWN")
-        store = {
-            "name": entry["name"],
-            "category": normalize_category(entry.get("categoryLabel")),
-            "categoryLabel": entry.get("categoryLabel"),
-            "floorId": floor_label.replace("F", ""),
-            "floorLabel": floor_label,
-            "status": "Active",
-        }
-        floors.setdefault(floor_label, []).append(store)
-
-    floor_entries = []
-    for floor_label, stores in floors.items():
-        order = 0
-        match = re.match(r"^(B\\d+|GF|G|UG|LG|MF|M|\\d{1,2})", floor_label, re.IGNORECASE)
-        if match:
-            value = match.group(1).upper()
-            if value.startswith("B"):
-                order = -int(value[1:])
-            elif value in {"G", "GF", "UG", "LG", "M", "MF"}:
-                order = 0
-            else:
-                order = int(value)
-        floor_entries.append({
-            "id": floor_label.replace("F", ""),
-            "label": floor_label,
-            "name": floor_label,
-            "order": order,
-            "stores": stores,
-        })
-
-    floor_entries.sort(key=lambda item: item.get("order", 0))
-
-    retrieved_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-    output = {
-        "mallSlug": "central-chaengwattana",
-        "source": {
+    result = {}
+
+    tokenizer = HtmlTokenParser(SHOPLIST_GRAMMAR)
+
+    def parse(chunk):
+        for entry in tokenizer.feed(chunk):
+            yield entry_to_store(entry)
+
+    def finish_parse():
+        for entry in tokenizer.close():
+            yield entry_to_store(entry)
+
+    def collect(store):
+        floor = floors.get(store.floorLabel)
+        if floor is None:
+            floor = floors[store.floorLabel] = Floor(store.floorId, store.floorLabel, store.floorLabel)
+        floor.stores.append(store)
+
+    def write():
+        floor_entries = []
+        for floor_label, floor in floors.items():
+            match = re.match(r"^(B\d+|GF|G|UG|LG|MF|M|\d{1,2})", floor_label, re.IGNORECASE)
+            if match:
+                value = match.group(1).upper()
+                if value.startswith("B"):
+                    floor.order = -int(value[1:])
+                elif value in {"G", "GF", "UG", "LG", "M", "MF"}:
+                    floor.order = 0
+                else:
+                    floor.order = int(value)
+            floor_entries.append(floor)
+
+        floor_entries.sort(key=lambda item: item.order)
+
+        retrieved_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        source = {
             "name": "Central Chaengwattana Shop Directory (official)",
             "url": DIRECTORY_URL,
             "retrievedAt": retrieved_at,
-        },
-        "retrievedAt": retrieved_at,
-        "floorCount": len(floor_entries),
-        "storeCount": sum(len(f["stores"]) for f in floor_entries),
-        "floors": floor_entries,
-    }
-
-    out_dir = os.path.join(os.getcwd(), "data", "directories")
-    os.makedirs(out_dir, exist_ok=True)
-    out_path = os.path.join(out_dir, "central-chaengwattana.json")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
-
-    print(f"Extracted {output['storeCount']} stores for Central Chaengwattana")
+        }
+        result["storeCount"] = write_directory(
+            out_path, "central-chaengwattana", source, floor_entries, retrieved_at
+        )
+
+    pipeline = Pipeline([
+        Stage("fetch", fetch_html),
+        Stage("parse", parse, close=finish_parse),
+        Stage("write", collect, maxsize=256, close=write),
+    ])
+    pipeline.run([DIRECTORY_URL])
+
+    print(f"Extracted {result['storeCount']} stores for Central Chaengwattana")
     print(f"Output: {out_path}")
+    for line in pipeline.report():
+        print(line)
 
 
 if __name__ == "__main__":
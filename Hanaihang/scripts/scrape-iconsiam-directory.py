@@ -5,10 +5,15 @@ from datetime import datetime, timezone
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from directory_records import Floor, Store, write_directory
+from pipeline import Pipeline, Stage
+
 BASE_URL = "https://www.iconsiam.com/iconsiam-service"
 DIRECTORY_URL = "https://www.iconsiam.com/en/directory"
 USER_AGENT = "Mozilla/5.0 (HanaihangDataBot/1.0)"
 
+ENDPOINTS = ("shops", "dinings")
+
 CATEGORY_RULES = [
     (["FOOD", "DINING", "RESTAURANT", "CAFE", "DESSERT", "BAR", "BAKERY", "SNACK", "BEVERAGE", "EAT"], "Food & Beverage"),
     (["FASHION", "APPAREL", "CLOTHING", "LUXURY"], "Fashion"),
@@ -42,19 +47,17 @@ def fetch_json(path: str, params=None):
     return json.loads(payload)
 
 
-def fetch_all(endpoint: str, params: dict):
-    docs = []
+def iter_pages(endpoint: str, params: dict):
     page = 1
     while True:
         payload = dict(params)
         payload["page"] = page
         payload["limit"] = payload.get("limit", 200)
         data = fetch_json(endpoint, payload)
-        docs.extend(data.get("docs", []))
+        yield page, data.get("docs", [])
         if not data.get("hasNextPage"):
             break
         page = data.get("nextPage") or page + 1
-    return docs
 
 
 def pick_text(value):
@@ -130,10 +133,41 @@ def format_hours(opening_hours):
     return None
 
 
-def main():
-    floors_payload = fetch_json("floors", {"limit": 200, "locale": "*"})
-    floors = {floor.get("name"): floor for floor in floors_payload.get("docs", [])}
+def normalize_listing(doc, endpoint):
+    title = doc.get("title") or {}
+    name = (title.get("en") or title.get("th") or title.get("zh") or "").strip()
+    if not name:
+        return None
+    floor_name = (doc.get("floor") or {}).get("name") or "UNKNOWN"
+    zone = doc.get("location_zone")
+    unit = pick_text(doc.get("location_shop_number"))
+    phone = None
+    contact = doc.get("contact_info")
+    if isinstance(contact, dict):
+        phone = contact.get("phone") or None
+    hours = format_hours(doc.get("opening_hours"))
+
+    category_names = collect_category_names(doc.get("categories"))
+    category_label = category_names[0] if category_names else None
+    category = normalize_category(category_names, endpoint)
+
+    return Store(
+        name,
+        id=f"iconsiam-{endpoint}-{doc.get('id')}",
+        category=category,
+        categoryLabel=category_label,
+        floorId=floor_name,
+        floorLabel=floor_name,
+        unit=unit or "",
+        phone=phone,
+        hours=hours,
+        status="Active" if doc.get("status") == "ACTIVE" else "Closed",
+        landmarks=[f"Zone: {zone}"] if zone else [],
+        sourceType=endpoint,
+    )
 
+
+def main():
     base_params = {
         "locale": "*",
         "where[status][equals]": "ACTIVE",
@@ -141,83 +175,78 @@ def main():
         "sort": "title.en",
     }
 
-    listings = []
-    for endpoint in ("shops", "dinings"):
-        docs = fetch_all(endpoint, base_params)
-        for doc in docs:
-            title = doc.get("title") or {}
-            name = (title.get("en") or title.get("th") or title.get("zh") or "").strip()
-            if not name:
-                continue
-            floor_name = (doc.get("floor") or {}).get("name") or "UNKNOWN"
-            zone = doc.get("location_zone")
-            unit = pick_text(doc.get("location_shop_number"))
-            phone = None
-            contact = doc.get("contact_info")
-            if isinstance(contact, dict):
-                phone = contact.get("phone") or None
-            hours = format_hours(doc.get("opening_hours"))
-
-            category_names = collect_category_names(doc.get("categories"))
-            category_label = category_names[0] if category_names else None
-            category = normalize_category(category_names, endpoint)
-
-            listings.append({
-                "id": f"iconsiam-{endpoint}-{doc.get('id')}",
-                "name": name,
-                "category": category,
-                "categoryLabel": category_label,
-                "floorId": floor_name,
-                "floorLabel": floor_name,
-                "unit": unit or "",
-                "phone": phone,
-                "hours": hours,
-                "status": "Active" if doc.get("status") == "ACTIVE" else "Closed",
-                "landmarks": [f"Zone: {zone}"] if zone else [],
-                "sourceType": endpoint,
-            })
+    out_dir = os.path.join(os.getcwd(), "data", "directories")
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, "iconsiam.json")
 
+    floors = {}
     stores_by_floor = {}
-    for store in listings:
-        floor_key = store["floorId"]
-        stores_by_floor.setdefault(floor_key, []).append(store)
-
-    floor_entries = []
-    for floor_name, stores in stores_by_floor.items():
-        meta = floors.get(floor_name) or {}
-        floor_entries.append({
-            "id": floor_name,
-            "label": floor_name,
-            "name": meta.get("name") or floor_name,
-            "order": meta.get("order") if isinstance(meta.get("order"), int) else 0,
-            "stores": stores,
-        })
-
-    floor_entries.sort(key=lambda item: item.get("order", 0))
-
-    retrieved_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-    output = {
-        "mallSlug": "iconsiam",
-        "source": {
+    result = {}
+
+    def fetch(task):
+        if task == "floors":
+            floors_payload = fetch_json("floors", {"limit": 200, "locale": "*"})
+            yield task, 0, floors_payload.get("docs", [])
+            return
+        for page, docs in iter_pages(task, base_params):
+            yield task, page, docs
+
+    def normalize(batch):
+        endpoint, page, docs = batch
+        if endpoint == "floors":
+            yield endpoint, None, {floor.get("name"): floor for floor in docs}
+            return
+        for position, doc in enumerate(docs):
+            store = normalize_listing(doc, endpoint)
+            if store is not None:
+                # Pages arrive interleaved; keep the sequential shops-then-dinings order.
+                yield endpoint, (ENDPOINTS.index(endpoint), page, position), store
+
+    def collect(record):
+        endpoint, key, value = record
+        if endpoint == "floors":
+            floors.update(value)
+        else:
+            stores_by_floor.setdefault(value.floorId, []).append((key, value))
+
+    def write():
+        floor_entries = []
+        for floor_name, keyed_stores in stores_by_floor.items():
+            keyed_stores.sort(key=lambda item: item[0])
+            meta = floors.get(floor_name) or {}
+            floor = Floor(
+                floor_name,
+                floor_name,
+                meta.get("name") or floor_name,
+                meta.get("order") if isinstance(meta.get("order"), int) else 0,
+            )
+            floor.stores = [store for _, store in keyed_stores]
+            floor_entries.append((keyed_stores[0][0], floor))
+
+        floor_entries.sort(key=lambda item: (item[1].order, item[0]))
+
+        retrieved_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        source = {
             "name": "ICONSIAM Directory (official)",
             "url": DIRECTORY_URL,
             "retrievedAt": retrieved_at,
             "note": "Data fetched from iconsiam-service/shops and iconsiam-service/dinings endpoints.",
-        },
-        "retrievedAt": retrieved_at,
-        "floorCount": len(floor_entries),
-        "storeCount": len(listings),
-        "floors": floor_entries,
-    }
-
-    out_dir = os.path.join(os.getcwd(), "data", "directories")
-    os.makedirs(out_dir, exist_ok=True)
-    out_path = os.path.join(out_dir, "iconsiam.json")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
-
-    print(f"Extracted {len(listings)} stores for ICONSIAM")
+        }
+        result["storeCount"] = write_directory(
+            out_path, "iconsiam", source, [floor for _, floor in floor_entries], retrieved_at
+        )
+
+    pipeline = Pipeline([
+        Stage("fetch", fetch, workers=1 + len(ENDPOINTS), maxsize=4),
+        Stage("normalize", normalize, maxsize=4),
+        Stage("write", collect, maxsize=512, close=write),
+    ])
+    pipeline.run(["floors", *ENDPOINTS])
+
+    print(f"Extracted {result['storeCount']} stores for ICONSIAM")
     print(f"Output: {out_path}")
+    for line in pipeline.report():
+        print(line)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+# A token class is matched either by exact text (`tokens`) or by a regex that must
+# match the whole token (`pattern`). When several classes match a token, the one
+# declared first wins. A class's actions are tried in order until one applies.
+TokenClass = namedtuple("TokenClass", ["name", "actions", "tokens", "pattern"], defaults=[(), None])
+Action = namedtuple("Action", ["verb", "field", "transform", "guard"], defaults=[None, None, None])
+
+SKIP = Action("skip")
+START = Action("start")
+STOP = Action("stop")
+
+
+def context(field, transform=None):
+    # Carried into every record emitted after this token (e.g. category headers).
+    return Action("context", field, transform)
+
+
+def assign(field, transform=None):
+    return Action("assign", field, transform)
+
+
+def fill(field, transform=None):
+    # Only applies while the field is still empty.
+    return Action("fill", field, transform)
+
+
+def append(field, unless=None):
+    # Joins the token onto an already filled field, unless `unless` is filled too.
+    return Action("append", field, None, unless)
+
+
+def emit(field, requires, transform=None):
+    # Sets the field, yields the record if `requires` is filled, then starts a new record.
+    return Action("emit", field, transform, requires)
+
+
+class TokenGrammar:
+    def __init__(self, classes, default):
+        self.default = default
+        self.exact = {}
+        patterns = []
+        self.by_group = {}
+        for index, token_class in enumerate(classes):
+            for token in token_class.tokens:
+                self.exact.setdefault(token, (index, token_class))
+            if token_class.pattern:
+                group = f"c{index}"
+                patterns.append(f"(?P<{group}>{token_class.pattern})")
+                self.by_group[group] = (index, token_class)
+        self.pattern = re.compile("|".join(patterns), re.DOTALL) if patterns else None
+        # Exact classes declared before every pattern class never need the regex.
+        self.first_pattern = min((index for index, _ in self.by_group.values()), default=len(classes))
+        self.has_start = any(START in c.actions for c in [*classes, default])
+
+    def classify(self, token):
+        exact = self.exact.get(token)
+        if exact is not None and exact[0] < self.first_pattern:
+            return exact[1]
+        if self.pattern is not None:
+            match = self.pattern.fullmatch(token)
+            if match:
+                matched = self.by_group[match.lastgroup]
+                if exact is None or matched[0] < exact[0]:
+                    return matched[1]
+        if exact is not None:
+            return exact[1]
+        return self.default
+
+    def parse(self, tokens):
+        yield from TokenParser(self).feed(tokens)
+
+
+class TokenParser:
+    # Keeps parse state between calls so a token stream can be fed in pieces.
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.started = not grammar.has_start
+        self.stopped = False
+        self.scope = {}
+        self.record = {}
+
+    def feed(self, tokens):
+        scope = self.scope
+        for token in tokens:
+            if self.stopped:
+                return
+            token_class = self.grammar.classify(token)
+            if not self.started:
+                self.started = START in token_class.actions
+                continue
+
+            record = self.record
+            for verb, field, transform, guard in token_class.actions:
+                if verb in ("skip", "start"):
+                    break
+                if verb == "stop":
+                    self.stopped = True
+                    return
+                value = transform(token) if transform else token
+                if verb == "context":
+                    scope[field] = value
+                    break
+                if verb == "assign":
+                    record[field] = value
+                    break
+                if verb == "fill":
+                    if field in record:
+                        continue
+                    record[field] = value
+                    break
+                if verb == "append":
+                    if field not in record or (guard and guard in record):
+                        continue
+                    record[field] = f"{record[field]} {value}"
+                    break
+                if verb == "emit":
+                    record[field] = value
+                    if guard in record:
+                        yield {**scope, **record}
+                    self.record = {}
+                    break
+
+
+class TextCollector(HTMLParser):
+    # HTMLParser may split one text run across feed() calls, so text is only
+    # tokenized once the next piece of markup (or close()) ends the run.
+    def __init__(self):
+        super().__init__()
+        self.tokens = []
+        self._pending = []
+
+    def _flush(self):
+        if self._pending:
+            text = "".join(self._pending).strip()
+            self._pending = []
+            if text:
+                self.tokens.append(text)
+
+    def handle_data(self, data):
+        self._pending.append(data)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+
+    def handle_endtag(self, tag):
+        self._flush()
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+class HtmlTokenParser:
+    # Feeds HTML text chunks as they arrive and yields records as soon as their
+    # tokens are complete.
+    def __init__(self, grammar):
+        self.collector = TextCollector()
+        self.parser = TokenParser(grammar)
+
+    def _drain(self):
+        tokens = self.collector.tokens
+        self.collector.tokens = []
+        return self.parser.feed(tokens)
+
+    def feed(self, chunk):
+        self.collector.feed(chunk)
+        return self._drain()
+
+    def close(self):
+        self.collector.close()
+        return self._drain()